@@ -1,22 +1,42 @@
+from collections import deque
+from itertools import count
+
+
+# Source of ancestry-cache stamps; unique across all trees, so a stamp
+# issued by one tree never matches another tree's current generation
+_lineage_stamps = count(1)
+
+
 # =========================
 # Person Node
 # =========================
 
 class Person:
+    # Fixed attribute set → no per-instance __dict__
+    __slots__ = (
+        "person_id", "ix", "name", "_name_lower", "house", "synthetic",
+        "x", "y", "_subtree_width", "depth",
+        "spouse_positions",
+        "father", "mother", "children", "_children_ids",
+        "spouses", "_spouse_set",
+        "expanded", "width", "height",
+        "_ancestry_cache", "_ancestry_set", "_ancestry_gen", "_tree",
+    )
+
     def __init__(self, person_id, name, house=None, synthetic=False):
         self.person_id = person_id
+        self.ix = None   # dense index, assigned when linked into a FamilyTree
         self.name = name
+        self._name_lower = name.lower()   # search key
         self.house = house
         self.synthetic = synthetic
         # layout (computed)
         self.x = 0
         self.y = 0
         self._subtree_width = 0
+        self.depth = 0
         # spouse layout (visual only)
         self.spouse_positions = []  # list of (spouse, x, y)
-        # visual connections (computed)
-        self.marriage_lines = []   # list of ((x1, y1), (x2, y2))
-        self.child_lines = []      # list of ((x1, y1), (x2, y2))
 
         # Navigation-only
         self.father = None
@@ -24,30 +44,64 @@ class Person:
 
         # Structural
         self.children = []
+        self._children_ids = set()   # mirrors children for O(1) membership
 
         # Non-structural
         self.spouses = []
+        self._spouse_set = set()   # mirrors spouses for O(1) membership
 
         # Visualization state
         self.expanded = True   # root & nodes expanded by default
         # bounding box (computed)
         self.width = 1.0   # visual node width
         self.height = 1.0
+        # ancestry (cached, see FamilyTree.get_path_to_root)
+        self._ancestry_cache = None
+        self._ancestry_set = None
+        self._ancestry_gen = 0   # lineage stamp of the cached path
+        # owning tree (set by FamilyTree._attach)
+        self._tree = None
 
 
     def add_spouse(self, spouse):
-        if spouse not in self.spouses:
+        if spouse not in self._spouse_set:
             self.spouses.append(spouse)
+            self._spouse_set.add(spouse)
             spouse.spouses.append(self)
+            spouse._spouse_set.add(self)
+            if self._tree is not None:
+                self._tree._attach(spouse)
+            elif spouse._tree is not None:
+                spouse._tree._attach(self)
+            self._invalidate_layout()
 
     def add_child(self, child, father=None, mother=None):
-        if child not in self.children:
+        if child.person_id not in self._children_ids:
             self.children.append(child)
+            self._children_ids.add(child.person_id)
+            if self._tree is not None:
+                self._tree._attach(child)
+            self._invalidate_layout()
 
-        if father:
+        relinked = False
+        if father and child.father is not father:
             child.father = father
-        if mother:
+            relinked = True
+        if mother and child.mother is not mother:
             child.mother = mother
+            relinked = True
+
+        if relinked:
+            # Paths follow father / mother, not children, so any cached
+            # path through this child may be affected; only the trees
+            # involved in the relink drop their cached paths
+            linked = (self, child, father, mother)
+            for tree in {p._tree for p in linked if p is not None and p._tree is not None}:
+                tree.invalidate_ancestry()
+
+    def _invalidate_layout(self):
+        if self._tree is not None:
+            self._tree.invalidate_layout()
 
     def __repr__(self):
         return f"{self.name} ({self.house})"
@@ -61,14 +115,59 @@ class FamilyTree:
     def __init__(self, root):
         self.root = root
         self.index = {root.person_id: root}
+        self._ordered = [root]   # insertion order, mirrors index
+        self._name_index = [(root._name_lower, root)]
+        self._next_ix = 0
+        # Bumped on every structural / expand-state change
+        self._layout_version = 0
+        # Re-issued on every father / mother relink (see get_path_to_root)
+        self._lineage_generation = next(_lineage_stamps)
+        self._attach(root)   # root.ix == 0
+        # visual connections (computed), each line stored once
+        self.marriage_lines = []   # list of ((x1, y1), (x2, y2))
+        self.child_lines = []      # list of ((x1, y1), (x2, y2))
 
     def add_person(self, person):
         if person.person_id in self.index:
             raise ValueError("Duplicate person_id")
         self.index[person.person_id] = person
+        self._ordered.append(person)
+        self._name_index.append((person._name_lower, person))
+        self._attach(person)
+        self.invalidate_layout()
+
+    def _attach(self, person):
+        """
+        Give person, and everyone reachable through children / spouses,
+        a dense ix in this tree. Linking keeps this closed, so graph walks
+        can index flat bytearrays by ix even for persons that were only
+        linked and never passed to add_person.
+        """
+        stack = [person]
+        while stack:
+            p = stack.pop()
+            if p._tree is self:
+                continue
+            p._tree = self
+            p.ix = self._next_ix
+            self._next_ix += 1
+            stack.extend(p.children)
+            stack.extend(p.spouses)
+
+    def invalidate_layout(self):
+        self._layout_version += 1
+
+    def invalidate_ancestry(self):
+        self._lineage_generation = next(_lineage_stamps)
 
     def get(self, person_id):
         return self.index.get(person_id)
+
+    def persons(self):
+        """
+        All persons in insertion order (shared list, do not mutate)
+        """
+        return self._ordered
     def collapse_subtree(person):
         person.expanded = False
 
@@ -78,11 +177,17 @@ class FamilyTree:
     def search_by_name(self, query):
         q = query.lower()
         return [
-            p for p in self.index.values()
-            if q in p.name.lower()
+            p for name, p in self._name_index
+            if q in name
         ]
 
     def get_path_to_root(self, person):
+        """
+        Ancestors from the top down to person (cached, read-only tuple)
+        """
+        if person._ancestry_gen == self._lineage_generation:
+            return person._ancestry_cache
+
         path = []
         current = person
         visited = set()
@@ -92,12 +197,17 @@ class FamilyTree:
             path.append(current)
             current = current.father or current.mother
 
-        return list(reversed(path))
+        path.reverse()
+        person._ancestry_cache = tuple(path)
+        person._ancestry_set = None
+        person._ancestry_gen = self._lineage_generation
+        return person._ancestry_cache
 
 
 def collapse_all(tree):
-    for p in tree.index.values():
+    for p in tree.persons():
         p.expanded = False
+    tree.invalidate_layout()
 
 
 def expand_path(path):
@@ -154,29 +264,35 @@ class FamilyTreeValidator:
         return self.errors, self.warnings
 
     def _check_cycles(self):
-        visited = set()
-        stack = set()
-
-        def dfs(node):
-            if node.person_id in stack:
-                self.errors.append(f"Cycle detected at {node.name}")
-                return
-
-            if node.person_id in visited:
-                return
-
-            visited.add(node.person_id)
-            stack.add(node.person_id)
+        # Flat flag maps indexed by Person.ix
+        root = self.tree.root
+        visited = bytearray(self.tree._next_ix)
+        on_stack = bytearray(self.tree._next_ix)
+        visited[root.ix] = on_stack[root.ix] = 1
+        stack = [(root, iter(root.children))]
+
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+
+            # All children done → leave the current path
+            if child is None:
+                stack.pop()
+                on_stack[node.ix] = 0
+                continue
 
-            for child in node.children:
-                dfs(child)
+            if on_stack[child.ix]:
+                self.errors.append(f"Cycle detected at {child.name}")
+                continue
 
-            stack.remove(node.person_id)
+            if visited[child.ix]:
+                continue
 
-        dfs(self.tree.root)
+            visited[child.ix] = on_stack[child.ix] = 1
+            stack.append((child, iter(child.children)))
 
     def _check_parent_child_consistency(self):
-        for person in self.tree.index.values():
+        for person in self.tree.persons():
             for child in person.children:
                 if person.synthetic:
                     continue
@@ -187,29 +303,28 @@ class FamilyTreeValidator:
                     )
 
     def _check_spouse_consistency(self):
-        for person in self.tree.index.values():
+        for person in self.tree.persons():
             for spouse in person.spouses:
-                if person not in spouse.spouses:
+                if person not in spouse._spouse_set:
                     self.warnings.append(
                         f"One-way spouse link: {person.name} → {spouse.name}"
                     )
 
     def _check_orphans(self):
-        reachable = set()
-
-        def dfs(node):
-            if node.person_id in reachable:
-                return
-            reachable.add(node.person_id)
-            for child in node.children:
-                dfs(child)
+        reachable = bytearray(self.tree._next_ix)
+        stack = [self.tree.root]
 
-        dfs(self.tree.root)
+        while stack:
+            node = stack.pop()
+            if reachable[node.ix]:
+                continue
+            reachable[node.ix] = 1
+            stack.extend(node.children)
 
-        for person in self.tree.index.values():
+        for person in self.tree.persons():
             if person.synthetic:
                 continue
-            if person.person_id not in reachable:
+            if not reachable[person.ix]:
                 # Allow spouse-only nodes
                 if person.spouses:
                     continue
@@ -233,16 +348,26 @@ class TreeLayoutEngine:
     # Width calculation
     # ----------------------------
     def _compute_width(self, node):
-        # Collapsed or leaf → fixed width
-        if not node.children or not node.expanded:
-            node._subtree_width = 1
-            return 1
+        # Post-order: children are sized before their parent
+        stack = [(node, False)]
+
+        while stack:
+            current, children_done = stack.pop()
+
+            # Collapsed or leaf → fixed width
+            if not current.children or not current.expanded:
+                current._subtree_width = 1
+                continue
+
+            if not children_done:
+                stack.append((current, True))
+                for child in reversed(current.children):
+                    stack.append((child, False))
+                continue
 
-        width = 0
-        for child in node.children:
-            width += self._compute_width(child)
+            width = sum(child._subtree_width for child in current.children)
+            current._subtree_width = max(width, 1)
 
-        node._subtree_width = max(width, 1)
         return node._subtree_width
 
 
@@ -250,23 +375,34 @@ class TreeLayoutEngine:
     # Position assignment
     # ----------------------------
     def _assign_positions(self, node, x_offset, depth):
-        node.y = depth * self.v_spacing
+        # Post-order: a parent is centred once its children are placed
+        stack = [(node, x_offset, depth, False)]
 
-        # Collapsed or leaf
-        if not node.children or not node.expanded:
-            node.x = x_offset + self.h_spacing / 2
-            return
+        while stack:
+            current, offset, level, children_done = stack.pop()
+
+            if children_done:
+                child_centers = [child.x for child in current.children]
+                current.x = sum(child_centers) / len(child_centers)
+                continue
+
+            current.y = level * self.v_spacing
+            current.depth = level
+
+            # Collapsed or leaf
+            if not current.children or not current.expanded:
+                current.x = offset + self.h_spacing / 2
+                continue
 
-        current_x = x_offset
-        child_centers = []
+            stack.append((current, offset, level, True))
 
-        for child in node.children:
-            child_width = child._subtree_width * self.h_spacing
-            self._assign_positions(child, current_x, depth + 1)
-            child_centers.append(child.x)
-            current_x += child_width
+            current_x = offset
+            placements = []
+            for child in current.children:
+                placements.append((child, current_x, level + 1, False))
+                current_x += child._subtree_width * self.h_spacing
 
-        node.x = sum(child_centers) / len(child_centers)
+            stack.extend(reversed(placements))
 
 
 class SpouseLayoutEngine:
@@ -274,13 +410,21 @@ class SpouseLayoutEngine:
         self.spouse_spacing = spouse_spacing
 
     def layout(self, tree):
-        visited = set()
+        persons = tree.persons()
+        placed = bytearray(tree._next_ix)   # indexed by Person.ix
+
+        # Re-layout must not stack up stale entries
+        for person in persons:
+            if person.spouses:
+                person.spouse_positions.clear()
 
-        for person in tree.index.values():
-            if person.person_id in visited:
+        for person in persons:
+            if not person.spouses or placed[person.ix]:
                 continue
+            placed[person.ix] = 1
 
-            if not person.spouses:
+            pending = [s for s in person.spouses if not placed[s.ix]]
+            if not pending:
                 continue
 
             # Anchor is the person already placed by tree layout
@@ -291,33 +435,28 @@ class SpouseLayoutEngine:
             offset_index = 1
             direction = 1  # right first
 
-            for spouse in person.spouses:
-                if spouse.person_id in visited:
-                    continue
-
+            for spouse in pending:
                 spouse.x = base_x + direction * offset_index * self.spouse_spacing
                 spouse.y = base_y
+                spouse.depth = person.depth
 
                 person.spouse_positions.append((spouse, spouse.x, spouse.y))
                 spouse.spouse_positions.append((person, base_x, base_y))
 
-                visited.add(spouse.person_id)
+                placed[spouse.ix] = 1
 
                 direction *= -1
                 if direction > 0:
                     offset_index += 1
 
-            visited.add(person.person_id)
-
 class ConnectionEngine:
     def __init__(self):
         pass
 
     def build(self, tree):
         # Clear previous connections
-        for p in tree.index.values():
-            p.marriage_lines.clear()
-            p.child_lines.clear()
+        tree.marriage_lines.clear()
+        tree.child_lines.clear()
 
         self._build_marriages(tree)
         self._build_children(tree)
@@ -328,23 +467,23 @@ class ConnectionEngine:
     def _build_marriages(self, tree):
         seen = set()
 
-        for person in tree.index.values():
+        for person in tree.persons():
             for spouse in person.spouses:
-                key = tuple(sorted([person.person_id, spouse.person_id]))
+                key = frozenset((person.person_id, spouse.person_id))
                 if key in seen:
                     continue
 
                 seen.add(key)
 
-                line = ((person.x, person.y), (spouse.x, spouse.y))
-                person.marriage_lines.append(line)
-                spouse.marriage_lines.append(line)
+                tree.marriage_lines.append(
+                    ((person.x, person.y), (spouse.x, spouse.y))
+                )
 
     # ----------------------------
     # Child connections
     # ----------------------------
     def _build_children(self, tree):
-        for parent in tree.index.values():
+        for parent in tree.persons():
 
             # Do not draw children if collapsed
             if not parent.expanded:
@@ -355,22 +494,21 @@ class ConnectionEngine:
                 mother = child.mother
 
                 # Case 1: married parents
-                if father and mother and mother in father.spouses:
+                if father and mother and mother in father._spouse_set:
                     mx = (father.x + mother.x) / 2
                     my = father.y
 
                     parent_point = (mx, my)
                     child_point = (child.x, child.y)
 
-                    father.child_lines.append((parent_point, child_point))
-                    mother.child_lines.append((parent_point, child_point))
+                    tree.child_lines.append((parent_point, child_point))
 
                 # Case 2: single parent
                 else:
                     parent_point = (parent.x, parent.y)
                     child_point = (child.x, child.y)
 
-                    parent.child_lines.append((parent_point, child_point))
+                    tree.child_lines.append((parent_point, child_point))
 
 
 class CollisionEngine:
@@ -379,20 +517,20 @@ class CollisionEngine:
 
     def resolve(self, tree):
         """
-        Resolve collisions level-by-level (same y)
+        Resolve collisions level-by-level (same depth), top → bottom
         """
         levels = self._group_by_level(tree)
 
-        for y, nodes in levels.items():
-            self._resolve_level(nodes)
+        for depth in sorted(levels):
+            self._resolve_level(levels[depth])
 
     # ----------------------------
-    # Group nodes by Y (generation)
+    # Group nodes by depth (generation)
     # ----------------------------
     def _group_by_level(self, tree):
         levels = {}
-        for p in tree.index.values():
-            levels.setdefault(p.y, []).append(p)
+        for p in tree.persons():
+            levels.setdefault(p.depth, []).append(p)
         return levels
 
     # ----------------------------
@@ -418,14 +556,26 @@ class CollisionEngine:
     # Shift node + descendants
     # ----------------------------
     def _shift_subtree(self, node, dx):
-        node.x += dx
+        queue = deque([node])
 
-        for child in node.children:
-            self._shift_subtree(child, dx)
+        while queue:
+            current = queue.popleft()
+            current.x += dx
+            queue.extend(current.children)
 
-        # Shift spouses with anchor
-        for spouse, _, _ in node.spouse_positions:
-            spouse.x += dx
+            # Shift spouses with anchor
+            for spouse, _, _ in current.spouse_positions:
+                spouse.x += dx
+
+
+def run_layout_pipeline(tree):
+    """
+    Full layout pipeline: tree → spouses → connections → collisions
+    """
+    TreeLayoutEngine().layout(tree)
+    SpouseLayoutEngine().layout(tree)
+    ConnectionEngine().build(tree)
+    CollisionEngine().resolve(tree)
 
 class SearchController:
     def __init__(self, tree):
@@ -446,6 +596,8 @@ class SearchController:
         for child in person.children:
             child.expanded = True
 
+        self.tree.invalidate_layout()
+
     def search_and_focus(self, query):
         matches = self.tree.search_by_name(query)
         if not matches:
@@ -560,6 +712,11 @@ def build_got_tree():
 import json
 from datetime import datetime
 
+try:
+    import orjson  # optional, faster serializer
+except ImportError:
+    orjson = None
+
 
 class JSONExporter:
     def export(self, tree, view_offset=(0, 0)):
@@ -588,12 +745,14 @@ class JSONExporter:
     # Nodes
     # ----------------------------
     def _export_nodes(self, tree, data):
-        for p in tree.index.values():
-            node = {
+        nodes = [None] * len(tree.index)
+
+        for i, p in enumerate(tree.persons()):
+            nodes[i] = {
                 "id": p.person_id,
                 "name": p.name,
                 "house": p.house,
-                "synthetic": getattr(p, "synthetic", False),
+                "synthetic": p.synthetic,
 
                 # layout
                 "x": p.x,
@@ -608,46 +767,53 @@ class JSONExporter:
                 "children": [c.person_id for c in p.children],
                 "spouses": [s.person_id for s in p.spouses]
             }
-            data["nodes"].append(node)
+
+        data["nodes"] = nodes
 
     # ----------------------------
     # Edges
     # ----------------------------
     def _export_edges(self, tree, data):
-        seen_marriages = set()
-
-        for p in tree.index.values():
-
-            # marriage lines
-            for ((x1, y1), (x2, y2)) in p.marriage_lines:
-                key = tuple(sorted([(x1, y1), (x2, y2)]))
-                if key in seen_marriages:
-                    continue
-                seen_marriages.add(key)
-
-                data["edges"]["marriages"].append({
-                    "from": {"x": x1, "y": y1},
-                    "to": {"x": x2, "y": y2}
-                })
+        # ConnectionEngine stores every line once → no dedup needed
+        data["edges"]["marriages"] = [
+            {"from": {"x": x1, "y": y1}, "to": {"x": x2, "y": y2}}
+            for ((x1, y1), (x2, y2)) in tree.marriage_lines
+        ]
 
-            # child lines
-            for ((x1, y1), (x2, y2)) in p.child_lines:
-                data["edges"]["children"].append({
-                    "from": {"x": x1, "y": y1},
-                    "to": {"x": x2, "y": y2}
-                })
+        data["edges"]["children"] = [
+            {"from": {"x": x1, "y": y1}, "to": {"x": x2, "y": y2}}
+            for ((x1, y1), (x2, y2)) in tree.child_lines
+        ]
 
     # ----------------------------
     # Save helper
     # ----------------------------
     def save(self, tree, path, view_offset=(0, 0)):
         data = self.export(tree, view_offset)
+
+        # Compact output: the file is read by tools, not people
+        if orjson is not None:
+            with open(path, "wb") as f:
+                f.write(orjson.dumps(data))
+            return
+
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f, separators=(",", ":"))
 
+import math
 import tkinter as tk
 
 
+_HOUSE_COLORS = {
+    "Stark": "#9bb0c1",
+    "Targaryen": "#c0392b",
+    "Lannister": "#f1c40f",
+    "Baratheon": "#f39c12",
+    "Tully": "#3498db",
+    None: "#666"
+}
+
+
 class TkTreeRenderer:
     def __init__(
         self,
@@ -655,24 +821,39 @@ class TkTreeRenderer:
         view_offset=(0, 0),
         scale=80,
         padding=50,
-        node_radius=18
+        node_radius=18,
+        cell_size=2.0
     ):
         self.tree = tree
         self.dx, self.dy = view_offset
         self.scale = scale
         self.padding = padding
         self.node_radius = node_radius
+        self.cell_size = cell_size   # hit-test grid cell, world units
 
         # Camera state
         self.pan_x = 0
         self.pan_y = 0
         self.zoom = 1.0
+        self._update_transform()
 
         # Highlight / tooltip state
         self.highlighted = set()
-        self.tooltip = None
         self.hovered_person = None
 
+        # Hit-test grid: (cx, cy) -> [(x, y, person)], rebuilt after layout
+        self._grid = {}
+        self._grid_version = None
+
+        # Layout pipeline is run by the caller before the first draw
+        self._laid_out_version = tree._layout_version
+
+        # Persistent canvas items, recreated only after a relayout
+        self._node_items = {}    # person_id -> (person, oval_id, text_id)
+        self._edge_items = []    # (line_id, (x1, y1), (x2, y2))
+        self._node_fills = {}    # person_id -> current oval fill
+        self._items_version = None
+
         # ---- Tk root ----
         self.root = tk.Tk()
         self.root.title("Game of Thrones Family Tree")
@@ -686,6 +867,24 @@ class TkTreeRenderer:
         )
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
+        # ---- Tooltip items, created once and moved / hidden ----
+        self._tip_bg = self.canvas.create_rectangle(
+            0, 0, 0, 0,
+            fill="#000",
+            outline="#aaa",
+            state=tk.HIDDEN,
+            tags="tooltip_bg"
+        )
+        self._tip_text = self.canvas.create_text(
+            0, 0,
+            text="",
+            anchor=tk.NW,
+            fill="#fff",
+            font=("Helvetica", 10),
+            state=tk.HIDDEN,
+            tags="tooltip"
+        )
+
         # ---- Bindings (NOW canvas exists) ----
         self.canvas.bind("<Button-1>", self._on_click)
         self.canvas.bind("<Motion>", self._on_hover)
@@ -707,35 +906,32 @@ class TkTreeRenderer:
     def _pan(self, dx, dy):
         self.pan_x += dx
         self.pan_y += dy
-        self.draw()
+        self._update_transform()
+        self._redraw_only()
 
     def _compute_lineage(self, person):
-        lineage = set()
-
         # ancestors
-        current = person
-        while current:
-            lineage.add(current)
-            current = current.father or current.mother
+        lineage = set(self._compute_ancestry(person))
 
         # descendants
-        def dfs(node):
-            for c in node.children:
-                lineage.add(c)
-                dfs(c)
+        seen = bytearray(self.tree._next_ix)
+        stack = list(person.children)
+        while stack:
+            node = stack.pop()
+            if seen[node.ix]:
+                continue
+            seen[node.ix] = 1
+            lineage.add(node)
+            stack.extend(node.children)
 
-        dfs(person)
         return lineage
 
     def _compute_ancestry(self, person):
-        ancestry = set()
-        current = person
-
-        while current:
-            ancestry.add(current)
-            current = current.father or current.mother
-
-        return ancestry
+        # get_path_to_root drops a stale set along with a stale path
+        path = self.tree.get_path_to_root(person)
+        if person._ancestry_set is None:
+            person._ancestry_set = frozenset(path)
+        return person._ancestry_set
 
 
     def _on_zoom(self, event):
@@ -743,19 +939,55 @@ class TkTreeRenderer:
             self.zoom *= 1.1
         else:
             self.zoom /= 1.1
-        self.draw()
+        self._update_transform()
+        self._redraw_only()
 
-    def _on_hover(self, event):
-        wx = (event.x - self.padding) / self.scale / self.zoom - self.dx - self.pan_x
-        wy = (event.y - self.padding) / self.scale / self.zoom - self.dy - self.pan_y
+    # ----------------------------
+    # Hit testing
+    # ----------------------------
+    def _rebuild_grid(self):
+        cell = self.cell_size
+        grid = {}
+        for p in self.tree.persons():
+            key = (math.floor(p.x / cell), math.floor(p.y / cell))
+            grid.setdefault(key, []).append((p.x, p.y, p))
+
+        self._grid = grid
+        self._grid_version = self._laid_out_version
+
+    def _person_at(self, event):
+        """
+        Returns the person nearest to the event, if within node radius
+        """
+        if self._grid_version != self._laid_out_version:
+            self._rebuild_grid()
 
-        hovered = None
-        for p in self.tree.index.values():
-            dx = p.x - wx
-            dy = p.y - wy
-            if dx * dx + dy * dy <= (self.node_radius / self.scale / self.zoom) ** 2:
-                hovered = p
-                break
+        # Convert screen → world
+        wx = (event.x - self._ox) / self._sx
+        wy = (event.y - self._oy) / self._sy
+
+        # Only the cells the hit circle overlaps
+        cell = self.cell_size
+        r = self.node_radius / self._sx
+        cx0, cx1 = math.floor((wx - r) / cell), math.floor((wx + r) / cell)
+        cy0, cy1 = math.floor((wy - r) / cell), math.floor((wy + r) / cell)
+
+        best = None
+        best_d2 = r * r
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for x, y, p in self._grid.get((cx, cy), ()):
+                    dx = x - wx
+                    dy = y - wy
+                    d2 = dx * dx + dy * dy
+                    if d2 <= best_d2:
+                        best = p
+                        best_d2 = d2
+
+        return best
+
+    def _on_hover(self, event):
+        hovered = self._person_at(event)
 
         if hovered != self.hovered_person:
             self.hovered_person = hovered
@@ -773,162 +1005,191 @@ class TkTreeRenderer:
         if person.mother:
             text += f"\nMother: {person.mother.name}"
 
-        self.tooltip = self.canvas.create_text(
-            x + 10,
-            y + 10,
-            text=text,
-            anchor=tk.NW,
-            fill="#fff",
-            font=("Helvetica", 10),
-            tags="tooltip"
-        )
+        self.canvas.itemconfig(self._tip_text, text=text, state=tk.NORMAL)
+        self.canvas.coords(self._tip_text, x + 10, y + 10)
 
-        bg = self.canvas.bbox(self.tooltip)
-        self.canvas.create_rectangle(
-            bg,
-            fill="#000",
-            outline="#aaa",
-            tags="tooltip_bg"
-        )
-        self.canvas.tag_raise(self.tooltip)
+        bg = self.canvas.bbox(self._tip_text)
+        self.canvas.coords(self._tip_bg, *bg)
+        self.canvas.itemconfig(self._tip_bg, state=tk.NORMAL)
+
+        # Nodes may have been recreated above the tooltip since last time
+        self.canvas.tag_raise(self._tip_bg)
+        self.canvas.tag_raise(self._tip_text)
 
     def _hide_tooltip(self):
-        self.canvas.delete("tooltip")
-        self.canvas.delete("tooltip_bg")
+        self.canvas.itemconfig(self._tip_text, state=tk.HIDDEN)
+        self.canvas.itemconfig(self._tip_bg, state=tk.HIDDEN)
+
     def _on_shift_click(self, event):
-        wx = (event.x - self.padding) / (self.scale * self.zoom) - self.dx - self.pan_x
-        wy = (event.y - self.padding) / (self.scale * self.zoom) - self.dy - self.pan_y
+        p = self._person_at(event)
+        if p is None:
+            return
+
+        # Toggle expand ONLY
+        p.expanded = not p.expanded
+        self.tree.invalidate_layout()
 
-        for p in self.tree.index.values():
-            dx = p.x - wx
-            dy = p.y - wy
-            if dx * dx + dy * dy <= (self.node_radius / self.scale / self.zoom) ** 2:
+        self._relayout()
+        self._redraw_only()
 
-                # Toggle expand ONLY
-                p.expanded = not p.expanded
+    def _relayout(self):
+        """
+        Re-runs the layout pipeline if the tree changed since the last run
+        """
+        if self._laid_out_version == self.tree._layout_version:
+            return
 
-                TreeLayoutEngine().layout(self.tree)
-                SpouseLayoutEngine().layout(self.tree)
-                ConnectionEngine().build(self.tree)
-                CollisionEngine().resolve(self.tree)
+        run_layout_pipeline(self.tree)
 
-                self.draw()
-                return
+        self._laid_out_version = self.tree._layout_version
 
 
     # ----------------------------
     # Coordinate transform
     # ----------------------------
+    def _update_transform(self):
+        # world → screen is x * s + o per axis; refresh on every pan / zoom
+        self._sx = self._sy = self.scale * self.zoom
+        self._ox = (self.dx + self.pan_x) * self._sx + self.padding
+        self._oy = (self.dy + self.pan_y) * self._sy + self.padding
+
     def world_to_screen(self, x, y):
-        sx = (x + self.dx + self.pan_x) * self.scale * self.zoom + self.padding
-        sy = (y + self.dy + self.pan_y) * self.scale * self.zoom + self.padding
-        return sx, sy
+        return x * self._sx + self._ox, y * self._sy + self._oy
 
 
     def _on_click(self, event):
-        # Convert screen → world
-        wx = (event.x - self.padding) / (self.scale * self.zoom) - self.dx - self.pan_x
-        wy = (event.y - self.padding) / (self.scale * self.zoom) - self.dy - self.pan_y
-
-        for p in self.tree.index.values():
-            dx = p.x - wx
-            dy = p.y - wy
-            if dx * dx + dy * dy <= (self.node_radius / self.scale / self.zoom) ** 2:
+        p = self._person_at(event)
+        if p is None:
+            return
 
-                # 🔴 ONLY ancestry highlight
-                self.highlighted = self._compute_ancestry(p)
+        # 🔴 ONLY ancestry highlight
+        self.highlighted = self._compute_ancestry(p)
 
-                self.draw()
-                return
+        self._redraw_only()
 
 
     # ----------------------------
     # Draw pipeline
     # ----------------------------
     def draw(self):
-        self.canvas.delete("all")
+        self._relayout()
+        self._redraw_only()
+
+        self.root.mainloop()
+
+    def _redraw_only(self):
+        # Same layout → move / recolor the existing items
+        if self._items_version == self._laid_out_version:
+            self._update_connections()
+            self._update_nodes()
+            return
+
+        self.canvas.delete("edge", "node")
+        self._edge_items.clear()
+        self._node_items.clear()
+        self._node_fills.clear()
 
         self._draw_connections()
         self._draw_nodes()
-
-        self.root.mainloop()
+        self._items_version = self._laid_out_version
 
     # ----------------------------
     # Connections
     # ----------------------------
     def _draw_connections(self):
-        for p in self.tree.index.values():
-
-            # marriage lines
-            for (a, b) in p.marriage_lines:
-                x1, y1 = self.world_to_screen(*a)
-                x2, y2 = self.world_to_screen(*b)
-                self.canvas.create_line(
-                    x1, y1, x2, y2,
-                    fill="#888",
-                    width=2
-                )
-
-            # child lines
-            for (a, b) in p.child_lines:
-                x1, y1 = self.world_to_screen(*a)
-                x2, y2 = self.world_to_screen(*b)
-                self.canvas.create_line(
-                    x1, y1, x2, y2,
-                    fill="#aaa",
-                    width=2
-                )
+        # marriage lines
+        for (a, b) in self.tree.marriage_lines:
+            x1, y1 = self.world_to_screen(*a)
+            x2, y2 = self.world_to_screen(*b)
+            line = self.canvas.create_line(
+                x1, y1, x2, y2,
+                fill="#888",
+                width=2,
+                tags="edge"
+            )
+            self._edge_items.append((line, a, b))
+
+        # child lines
+        for (a, b) in self.tree.child_lines:
+            x1, y1 = self.world_to_screen(*a)
+            x2, y2 = self.world_to_screen(*b)
+            line = self.canvas.create_line(
+                x1, y1, x2, y2,
+                fill="#aaa",
+                width=2,
+                tags="edge"
+            )
+            self._edge_items.append((line, a, b))
+
+    def _update_connections(self):
+        sx, sy, ox, oy = self._sx, self._sy, self._ox, self._oy
+        for line, (x1, y1), (x2, y2) in self._edge_items:
+            self.canvas.coords(
+                line,
+                x1 * sx + ox, y1 * sy + oy,
+                x2 * sx + ox, y2 * sy + oy
+            )
 
     # ----------------------------
     # Nodes
     # ----------------------------
     def _draw_nodes(self):
-        for p in self.tree.index.values():
+        for p in self.tree.persons():
             if not p.expanded and p is not self.tree.root:
                 continue
 
             x, y = self.world_to_screen(p.x, p.y)
+            color = self._node_color(p)
 
-            if self.highlighted and p not in self.highlighted:
-                color = "#444"   # faded
-            else:
-                color = self._house_color(p.house)
-
-
-            self.canvas.create_oval(
+            oval = self.canvas.create_oval(
                 x - self.node_radius,
                 y - self.node_radius,
                 x + self.node_radius,
                 y + self.node_radius,
                 fill=color,
                 outline="#fff",
-                width=2
+                width=2,
+                tags="node"
             )
 
-            self.canvas.create_text(
+            text = self.canvas.create_text(
                 x,
                 y + self.node_radius + 12,
                 text=p.name,
                 fill="#eee",
                 font=("Helvetica", 10),
-                anchor=tk.N
+                anchor=tk.N,
+                tags="node"
             )
             outline_width = 3 if p in self.highlighted else 1
 
+            self._node_items[p.person_id] = (p, oval, text)
+            self._node_fills[p.person_id] = color
+
+    def _update_nodes(self):
+        r = self.node_radius
+        for p, oval, text in self._node_items.values():
+            x, y = self.world_to_screen(p.x, p.y)
+            self.canvas.coords(oval, x - r, y - r, x + r, y + r)
+            self.canvas.coords(text, x, y + r + 12)
+
+            # Only touch the fill when the highlight state changed it
+            color = self._node_color(p)
+            if self._node_fills[p.person_id] != color:
+                self.canvas.itemconfig(oval, fill=color)
+                self._node_fills[p.person_id] = color
+
+    def _node_color(self, p):
+        if self.highlighted and p not in self.highlighted:
+            return "#444"   # faded
+        return self._house_color(p.house)
 
 
     # ----------------------------
     # House colors
     # ----------------------------
     def _house_color(self, house):
-        return {
-            "Stark": "#9bb0c1",
-            "Targaryen": "#c0392b",
-            "Lannister": "#f1c40f",
-            "Baratheon": "#f39c12",
-            "Tully": "#3498db",
-            None: "#666"
-        }.get(house, "#888")
+        return _HOUSE_COLORS.get(house, "#888")
 
 
 # =========================
@@ -950,15 +1211,12 @@ if __name__ == "__main__":
     target = search.search_and_focus("jon")
     """
     # Expand everything
-    for p in tree.index.values():
+    for p in tree.persons():
         p.expanded = True
     target = None
 
     # 🧱 Layout pipeline
-    TreeLayoutEngine().layout(tree)
-    SpouseLayoutEngine().layout(tree)
-    ConnectionEngine().build(tree)
-    CollisionEngine().resolve(tree)
+    run_layout_pipeline(tree)
 
     # 🎥 Camera offset
     view_offset = (0, 0)
@@ -1,6 +1,7 @@
 import os
+from functools import cached_property
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import FrozenSet, List
 
 class Settings(BaseSettings):
     """Application configuration settings"""
@@ -17,7 +18,7 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:3000"
     
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins from comma-separated string"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(',')]
@@ -27,26 +28,35 @@ class Settings(BaseSettings):
     ALLOWED_EXTENSIONS: str = ".png,.jpg,.jpeg,.pdf"
     ALLOWED_MIME_TYPES: str = "image/png,image/jpeg,image/jpg,application/pdf"
     
-    @property
+    @cached_property
     def allowed_extensions_list(self) -> List[str]:
         """Parse allowed extensions from comma-separated string"""
         return [ext.strip() for ext in self.ALLOWED_EXTENSIONS.split(',')]
     
-    @property
+    @cached_property
     def allowed_mime_types_list(self) -> List[str]:
         """Parse allowed MIME types from comma-separated string"""
         return [mime.strip() for mime in self.ALLOWED_MIME_TYPES.split(',')]
     
+    @cached_property
+    def allowed_extensions_set(self) -> FrozenSet[str]:
+        """Allowed extensions for O(1) membership checks"""
+        return frozenset(self.allowed_extensions_list)
+    
+    @cached_property
+    def allowed_mime_types_set(self) -> FrozenSet[str]:
+        """Allowed MIME types for O(1) membership checks"""
+        return frozenset(self.allowed_mime_types_list)
+    
     # OCR Settings
     TESSERACT_LANG: str = "eng"
-    TESSERACT_CONFIG: str = "--oem 3 --psm 3"
-    
-    # Temporary Storage
-    TEMP_DIR: str = "/tmp/ocr_uploads"
+    TESSERACT_CONFIG: str = "--oem 1 --psm 3"
+    TESSERACT_MODEL: str = "fast"  # uses ./tessdata_<model>/ if present
     
     # Processing
     MAX_IMAGE_DIMENSION: int = 4000
     TARGET_DPI: int = 300
+    OCR_WORKERS: int = os.cpu_count() or 1
     
     class Config:
         env_file = ".env"
@@ -54,6 +64,3 @@ class Settings(BaseSettings):
 
 # Create settings instance
 settings = Settings()
-
-# Ensure temp directory exists
-os.makedirs(settings.TEMP_DIR, exist_ok=True)
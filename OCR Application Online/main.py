@@ -1,16 +1,22 @@
-import os
-import uuid
+import asyncio
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
-import aiofiles
-from typing import Dict
+from typing import Dict, Optional
 
 from config import settings
 from validators import FileValidator
-from ocr_processor import OCRProcessor
+from ocr_processor import (
+    OCRProcessor,
+    count_pdf_pages,
+    init_worker,
+    ocr_pdf_page_in_worker,
+    process_bytes_in_worker,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -19,24 +25,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize OCR processor
-ocr_processor = OCRProcessor()
+# Process pool for the blocking OCR work (created in lifespan)
+ocr_executor: Optional[ProcessPoolExecutor] = None
+
+def create_ocr_executor() -> ProcessPoolExecutor:
+    """Start a pool of single-threaded OCR workers"""
+    return ProcessPoolExecutor(
+        max_workers=settings.OCR_WORKERS,
+        initializer=init_worker
+    )
+
+async def run_in_ocr_pool(func, *args):
+    """
+    Run func(*args) in the OCR pool, replacing the pool if a worker died
+    
+    A crashed worker (segfault, OOM kill) marks the whole pool broken; the
+    pool is rebuilt for later requests and this one fails with a 500.
+    """
+    global ocr_executor
+    executor = ocr_executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        logger.error("OCR worker process died; restarting the OCR pool")
+        # Concurrent requests may see the same broken pool; rebuild once
+        if ocr_executor is executor:
+            ocr_executor = create_ocr_executor()
+            executor.shutdown(wait=False)
+        raise HTTPException(
+            status_code=500,
+            detail="OCR worker crashed while processing the file"
+        )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
+    global ocr_executor
+    
     # Startup
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Temporary directory: {settings.TEMP_DIR}")
+    
+    ocr_executor = create_ocr_executor()
+    logger.info(f"OCR workers: {settings.OCR_WORKERS}")
     yield
     # Shutdown
     logger.info("Shutting down application")
+    ocr_executor.shutdown(wait=True)
+
+async def ocr_pdf(content: bytes) -> Dict:
+    """
+    OCR a PDF with one pool task per page, so pages use every core
+    
+    Each task renders its own page from the PDF bytes; page rasters never
+    cross the process boundary or pile up in the API process.
+    """
+    try:
+        page_count = await run_in_ocr_pool(count_pdf_pages, content)
+        logger.info(f"Processing {page_count} PDF page(s) across the OCR pool")
+        results = await asyncio.gather(*(
+            run_in_ocr_pool(ocr_pdf_page_in_worker, content, page_number)
+            for page_number in range(page_count)
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        return OCRProcessor.pdf_error(e, settings.TESSERACT_LANG)
+    return OCRProcessor.summarize_pdf(results, settings.TESSERACT_LANG)
 
 # Create FastAPI application
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Modern OCR Web Application - Extract text from images and PDFs",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -67,26 +129,30 @@ async def health_check():
         "version": settings.APP_VERSION
     }
 
+# Supported languages, serialized once at import instead of on every request
+# In production, you could query Tesseract for available languages
+# For now, return common languages
+_LANGUAGES_PAYLOAD = {
+    "languages": [
+        {"code": "eng", "name": "English"},
+        {"code": "spa", "name": "Spanish"},
+        {"code": "fra", "name": "French"},
+        {"code": "deu", "name": "German"},
+        {"code": "ita", "name": "Italian"},
+        {"code": "por", "name": "Portuguese"},
+        {"code": "rus", "name": "Russian"},
+        {"code": "ara", "name": "Arabic"},
+        {"code": "chi_sim", "name": "Chinese (Simplified)"},
+        {"code": "jpn", "name": "Japanese"},
+    ],
+    "default": settings.TESSERACT_LANG
+}
+_LANGUAGES_RESPONSE = ORJSONResponse(_LANGUAGES_PAYLOAD)
+
 @app.get("/api/languages")
 async def get_supported_languages():
     """Get list of supported OCR languages"""
-    # In production, you could query Tesseract for available languages
-    # For now, return common languages
-    return {
-        "languages": [
-            {"code": "eng", "name": "English"},
-            {"code": "spa", "name": "Spanish"},
-            {"code": "fra", "name": "French"},
-            {"code": "deu", "name": "German"},
-            {"code": "ita", "name": "Italian"},
-            {"code": "por", "name": "Portuguese"},
-            {"code": "rus", "name": "Russian"},
-            {"code": "ara", "name": "Arabic"},
-            {"code": "chi_sim", "name": "Chinese (Simplified)"},
-            {"code": "jpn", "name": "Japanese"},
-        ],
-        "default": settings.TESSERACT_LANG
-    }
+    return _LANGUAGES_RESPONSE
 
 @app.post("/api/ocr")
 async def process_ocr(file: UploadFile = File(...)) -> Dict:
@@ -99,26 +165,24 @@ async def process_ocr(file: UploadFile = File(...)) -> Dict:
     Returns:
         JSON response with extracted text and metadata
     """
-    temp_file_path = None
-    
     try:
         # Validate uploaded file
         logger.info(f"Received file: {file.filename}")
         safe_filename, file_extension = FileValidator.validate_upload(file)
         
-        # Generate unique filename to avoid collisions
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        temp_file_path = os.path.join(settings.TEMP_DIR, unique_filename)
+        # Read upload into memory; decoded directly, no temp file round trip
+        content = await file.read()
         
-        # Save uploaded file to temporary location
-        logger.info(f"Saving file to: {temp_file_path}")
-        async with aiofiles.open(temp_file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
-        
-        # Process file with OCR
+        # Process file with OCR off the event loop
         logger.info(f"Processing file with OCR: {safe_filename}")
-        result = ocr_processor.process_file(temp_file_path, file_extension)
+        if file_extension == '.pdf':
+            result = await ocr_pdf(content)
+        else:
+            result = await run_in_ocr_pool(
+                process_bytes_in_worker,
+                content,
+                file_extension
+            )
         
         # Check if processing was successful
         if not result.get("success", False):
@@ -132,7 +196,7 @@ async def process_ocr(file: UploadFile = File(...)) -> Dict:
         
         logger.info(f"OCR completed successfully. Extracted {result.get('word_count', 0)} words")
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={
                 "success": True,
@@ -153,20 +217,11 @@ async def process_ocr(file: UploadFile = File(...)) -> Dict:
             status_code=500,
             detail=f"An error occurred during processing: {str(e)}"
         )
-        
-    finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-                logger.info(f"Cleaned up temporary file: {temp_file_path}")
-            except Exception as e:
-                logger.error(f"Failed to clean up temporary file: {str(e)}")
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -179,7 +234,7 @@ async def http_exception_handler(request, exc):
 async def general_exception_handler(request, exc):
     """General exception handler"""
     logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -1,14 +1,28 @@
+import io
 import os
+
+# Single-threaded Tesseract per worker. OpenMP reads these once, when
+# libtesseract is loaded, so they must be set before the imports below.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
 import cv2
 import numpy as np
-import pytesseract
+from tesserocr import PyTessBaseAPI
 from PIL import Image
-from pdf2image import convert_from_path
-from typing import Dict, List, Optional
-import tempfile
+import fitz
+from typing import Dict, List, Optional, Tuple
 import logging
 from config import settings
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_GRAY
+except ImportError:  # fall back to OpenCV decoding
+    TurboJPEG = None
+
+# EXIF tag id of Orientation
+EXIF_ORIENTATION = 0x0112
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -18,16 +32,74 @@ class OCRProcessor:
     def __init__(self):
         self.tesseract_config = settings.TESSERACT_CONFIG
         self.language = settings.TESSERACT_LANG
+        
+        # Persistent in-process Tesseract (one per worker, not thread-safe)
+        options = self.parse_tesseract_config(self.tesseract_config)
+        tessdata_path = self.tessdata_path()
+        if tessdata_path:
+            options["path"] = tessdata_path
+        self.api = PyTessBaseAPI(lang=self.language, **options)
+        
+        # libjpeg-turbo decoder for scaled JPEG decoding, if available
+        self.jpeg = None
+        if TurboJPEG is not None:
+            try:
+                self.jpeg = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"libjpeg-turbo unavailable, using OpenCV for JPEGs: {e}")
+    
+    @staticmethod
+    def tessdata_path() -> Optional[str]:
+        """Directory holding the TESSERACT_MODEL traineddata, if bundled"""
+        model_dir = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            f"tessdata_{settings.TESSERACT_MODEL}"
+        )
+        # Every language in e.g. "eng+deu" must be bundled, else use the system set
+        missing = [
+            lang for lang in settings.TESSERACT_LANG.split('+')
+            if not os.path.isfile(os.path.join(model_dir, f"{lang}.traineddata"))
+        ]
+        if not missing:
+            return model_dir
+        logger.info(
+            f"No {', '.join(missing)} model(s) in {model_dir}, using the system tessdata"
+        )
+        return None
+    
+    @staticmethod
+    def parse_tesseract_config(config: str) -> Dict[str, int]:
+        """Translate CLI-style '--oem N --psm N' flags into API arguments"""
+        options = {}
+        tokens = config.split()
+        for flag, value in zip(tokens, tokens[1:]):
+            if flag in ("--oem", "--psm"):
+                options[flag[2:]] = int(value)
+        return options
+    
+    def recognize(self, image: np.ndarray) -> Tuple[str, np.ndarray]:
+        """
+        Run Tesseract on a preprocessed single-channel image
+        
+        Returns:
+            (text, per-word confidences) from a single recognition pass
+        """
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        self.api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        
+        text = self.api.GetUTF8Text()
+        confidences = np.asarray(self.api.AllWordConfidences(), dtype=np.int32)
+        return text, confidences
     
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """
         Apply preprocessing pipeline to enhance OCR accuracy
         
         Steps:
-        1. Convert to grayscale
-        2. Apply Gaussian blur to reduce noise
-        3. Apply adaptive thresholding for better contrast
-        4. Optional: Deskew if needed
+        1. Convert to grayscale (decoders already emit 1-channel images)
+        2. Apply adaptive thresholding for better contrast
+        3. Optional: Deskew if needed
         """
         # Convert to grayscale if not already
         if len(image.shape) == 3:
@@ -35,26 +107,17 @@ class OCRProcessor:
         else:
             gray = image
         
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        
         # Apply adaptive thresholding
-        # This works better than simple thresholding for varying lighting conditions
-        thresh = cv2.adaptiveThreshold(
-            blurred,
+        # This works better than simple thresholding for varying lighting conditions.
+        # The Gaussian-weighted local mean already smooths noise, so no pre-blur.
+        return cv2.adaptiveThreshold(
+            gray,
             255,
             cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
             cv2.THRESH_BINARY,
             11,
             2
         )
-        
-        # Optional: Apply morphological operations to remove noise
-        kernel = np.ones((1, 1), np.uint8)
-        processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel)
-        
-        return processed
     
     def resize_image_if_needed(self, image: np.ndarray) -> np.ndarray:
         """Resize image if it exceeds maximum dimensions"""
@@ -67,27 +130,91 @@ class OCRProcessor:
             new_width = int(width * scale)
             new_height = int(height * scale)
             
-            # Resize with high-quality interpolation
+            # Area interpolation is the right kernel for downscaling
             resized = cv2.resize(
                 image,
                 (new_width, new_height),
-                interpolation=cv2.INTER_CUBIC
+                interpolation=cv2.INTER_AREA
             )
             logger.info(f"Resized image from {width}x{height} to {new_width}x{new_height}")
             return resized
         
         return image
     
-    def extract_text_from_image(self, image_path: str) -> Dict:
+    @staticmethod
+    def page_dpi(page: "fitz.Page") -> int:
+        """Pick a render DPI that keeps the page within MAX_IMAGE_DIMENSION"""
+        max_page_pt = max(page.rect.width, page.rect.height)
+        if max_page_pt <= 0:
+            return settings.TARGET_DPI
+        fit_dpi = settings.MAX_IMAGE_DIMENSION * 72 / max_page_pt
+        return max(1, int(min(settings.TARGET_DPI, fit_dpi)))
+    
+    def decode_jpeg(self, data: bytes) -> np.ndarray:
         """
-        Extract text from image file
+        Decode a JPEG to grayscale, letting libjpeg-turbo downscale in the IDCT
+        
+        Picks the largest of 1/1, 1/2, 1/4, 1/8 that fits MAX_IMAGE_DIMENSION;
+        resize_image_if_needed handles whatever is left over.
+        """
+        width, height, _, _ = self.jpeg.decode_header(data)
+        max_dim = settings.MAX_IMAGE_DIMENSION
+        scale = next(
+            (s for s in ((1, 1), (1, 2), (1, 4), (1, 8))
+             if max(width, height) * s[0] / s[1] <= max_dim),
+            (1, 8)
+        )
+        image = self.jpeg.decode(data, pixel_format=TJPF_GRAY, scaling_factor=scale)
+        # Drop the trailing channel axis so the image is plain 2-D grayscale
+        image = image.reshape(image.shape[:2])
+        
+        # libjpeg-turbo ignores EXIF orientation (cv2.imdecode honours it)
+        return self.apply_exif_orientation(image, self.exif_orientation(data))
+    
+    @staticmethod
+    def exif_orientation(data: bytes) -> int:
+        """Read the EXIF Orientation tag (1 = upright) without decoding pixels"""
+        with Image.open(io.BytesIO(data)) as im:
+            return im.getexif().get(EXIF_ORIENTATION, 1)
+    
+    @staticmethod
+    def apply_exif_orientation(image: np.ndarray, orientation: int) -> np.ndarray:
+        """Rotate / flip a decoded image so it displays upright"""
+        if orientation == 2:
+            return cv2.flip(image, 1)
+        if orientation == 3:
+            return cv2.rotate(image, cv2.ROTATE_180)
+        if orientation == 4:
+            return cv2.flip(image, 0)
+        if orientation == 5:
+            return cv2.transpose(image)
+        if orientation == 6:
+            return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+        if orientation == 7:
+            return cv2.flip(cv2.transpose(image), -1)
+        if orientation == 8:
+            return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        return image
+    
+    def extract_text_from_image(self, data: bytes, file_extension: str = "") -> Dict:
+        """
+        Extract text from encoded image bytes
         
         Returns:
             Dict with extracted text, confidence, and metadata
         """
         try:
-            # Read image
-            image = cv2.imread(image_path)
+            # Decode image straight from memory
+            image = None
+            if self.jpeg is not None and file_extension.lower() in ('.jpg', '.jpeg'):
+                try:
+                    image = self.decode_jpeg(data)
+                except Exception as e:
+                    # e.g. a mislabelled .jpg; let OpenCV have a go
+                    logger.warning(f"libjpeg-turbo decode failed, falling back to OpenCV: {e}")
+            if image is None:
+                # Decode straight to one channel; no 3-channel buffer or BGR->GRAY copy
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
             if image is None:
                 raise ValueError("Failed to load image")
             
@@ -97,32 +224,17 @@ class OCRProcessor:
             # Preprocess image
             processed_image = self.preprocess_image(image)
             
-            # Perform OCR with detailed data
-            ocr_data = pytesseract.image_to_data(
-                processed_image,
-                lang=self.language,
-                config=self.tesseract_config,
-                output_type=pytesseract.Output.DICT
-            )
-            
-            # Extract text
-            text = pytesseract.image_to_string(
-                processed_image,
-                lang=self.language,
-                config=self.tesseract_config
-            )
+            # Perform OCR
+            text, word_confidences = self.recognize(processed_image)
             
             # Calculate average confidence
-            confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-            
-            # Count words
-            words = [word for word in ocr_data['text'] if word.strip()]
+            confidences = word_confidences[word_confidences > 0]
+            avg_confidence = float(confidences.mean()) if confidences.size else 0
             
             return {
                 "text": text.strip(),
                 "confidence": round(avg_confidence, 2),
-                "word_count": len(words),
+                "word_count": int(word_confidences.size),
                 "language": self.language,
                 "success": True
             }
@@ -138,88 +250,112 @@ class OCRProcessor:
                 "error": str(e)
             }
     
-    def extract_text_from_pdf(self, pdf_path: str) -> Dict:
+    def render_page(self, page: "fitz.Page") -> np.ndarray:
+        """Rasterize one PDF page straight to grayscale, no PPM round trip"""
+        pix = page.get_pixmap(dpi=self.page_dpi(page), colorspace=fitz.csGRAY)
+        image = np.frombuffer(pix.samples, np.uint8)
+        return image.reshape(pix.height, pix.stride)[:, :pix.width]
+    
+    def ocr_page(self, image_np: np.ndarray) -> Tuple[str, np.ndarray, int]:
         """
-        Extract text from PDF file by converting to images
+        Run the preprocess / OCR pipeline on one rendered PDF page
+        
+        Returns:
+            (page text, positive word confidences, word count)
+        """
+        # Pages are rendered at a DPI that already fits, so no resize here
+        processed = self.preprocess_image(image_np)
+        
+        # Perform OCR
+        page_text, word_confidences = self.recognize(processed)
+        
+        confidences = word_confidences[word_confidences > 0]
+        return page_text.strip(), confidences, int(word_confidences.size)
+    
+    def ocr_pdf_page(self, data: bytes, page_number: int) -> Tuple[str, np.ndarray, int]:
+        """Render and OCR a single page (0-based) of a PDF"""
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return self.ocr_page(self.render_page(doc[page_number]))
+    
+    @staticmethod
+    def summarize_pdf(results: List[Tuple[str, np.ndarray, int]], language: str) -> Dict:
+        """
+        Combine per-page OCR results, in page order, into the PDF response
+        """
+        all_text = []
+        page_confidences = []
+        total_words = 0
+        
+        # Assemble results in page order
+        for i, (page_text, confidences, word_count) in enumerate(results):
+            page_confidences.append(confidences)
+            total_words += word_count
+            all_text.append(f"--- Page {i + 1} ---\n{page_text}")
+        
+        # Combine all pages
+        combined_text = "\n\n".join(all_text)
+        
+        # Calculate average confidence
+        all_confidences = np.concatenate(page_confidences) if page_confidences else np.empty(0)
+        avg_confidence = float(all_confidences.mean()) if all_confidences.size else 0
+        
+        return {
+            "text": combined_text,
+            "confidence": round(avg_confidence, 2),
+            "word_count": total_words,
+            "page_count": len(results),
+            "language": language,
+            "success": True
+        }
+    
+    @staticmethod
+    def pdf_error(error: Exception, language: str) -> Dict:
+        """Failed PDF response"""
+        logger.error(f"Error during PDF OCR processing: {str(error)}")
+        return {
+            "text": "",
+            "confidence": 0,
+            "word_count": 0,
+            "page_count": 0,
+            "language": language,
+            "success": False,
+            "error": str(error)
+        }
+    
+    def extract_text_from_pdf(self, data: bytes) -> Dict:
+        """
+        Extract text from PDF bytes by rasterizing each page
+        
+        Pages run one after another here; the API fans pages out across
+        the process pool instead (see main.ocr_pdf).
         
         Returns:
             Dict with extracted text from all pages
         """
         try:
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=settings.TARGET_DPI)
-            
-            all_text = []
-            all_confidences = []
-            total_words = 0
-            
-            # Process each page
-            for i, image in enumerate(images):
-                logger.info(f"Processing PDF page {i + 1}/{len(images)}")
-                
-                # Convert PIL Image to numpy array
-                image_np = np.array(image)
-                
-                # Convert RGB to BGR for OpenCV
-                if len(image_np.shape) == 3:
-                    image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-                
-                # Resize if needed
-                image_np = self.resize_image_if_needed(image_np)
-                
-                # Preprocess
-                processed = self.preprocess_image(image_np)
-                
-                # Extract text
-                page_text = pytesseract.image_to_string(
-                    processed,
-                    lang=self.language,
-                    config=self.tesseract_config
-                )
-                
-                # Get confidence data
-                ocr_data = pytesseract.image_to_data(
-                    processed,
-                    lang=self.language,
-                    config=self.tesseract_config,
-                    output_type=pytesseract.Output.DICT
-                )
-                
-                confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
-                if confidences:
-                    all_confidences.extend(confidences)
-                
-                words = [word for word in ocr_data['text'] if word.strip()]
-                total_words += len(words)
-                
-                all_text.append(f"--- Page {i + 1} ---\n{page_text.strip()}")
-            
-            # Combine all pages
-            combined_text = "\n\n".join(all_text)
-            
-            # Calculate average confidence
-            avg_confidence = sum(all_confidences) / len(all_confidences) if all_confidences else 0
-            
-            return {
-                "text": combined_text,
-                "confidence": round(avg_confidence, 2),
-                "word_count": total_words,
-                "page_count": len(images),
-                "language": self.language,
-                "success": True
-            }
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                logger.info(f"Processing {len(doc)} PDF page(s)")
+                results = [self.ocr_page(self.render_page(page)) for page in doc]
+            return self.summarize_pdf(results, self.language)
             
         except Exception as e:
-            logger.error(f"Error during PDF OCR processing: {str(e)}")
-            return {
-                "text": "",
-                "confidence": 0,
-                "word_count": 0,
-                "page_count": 0,
-                "language": self.language,
-                "success": False,
-                "error": str(e)
-            }
+            return self.pdf_error(e, self.language)
+    
+    def process_bytes(self, data: bytes, file_extension: str) -> Dict:
+        """
+        Process in-memory file contents based on extension
+        
+        Args:
+            data: Raw file contents
+            file_extension: File extension (.pdf, .png, etc.)
+        
+        Returns:
+            Dict with OCR results
+        """
+        if file_extension.lower() == '.pdf':
+            return self.extract_text_from_pdf(data)
+        else:
+            return self.extract_text_from_image(data, file_extension)
     
     def process_file(self, file_path: str, file_extension: str) -> Dict:
         """
@@ -232,7 +368,33 @@ class OCRProcessor:
         Returns:
             Dict with OCR results
         """
-        if file_extension.lower() == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        else:
-            return self.extract_text_from_image(file_path)
+        with open(file_path, 'rb') as f:
+            return self.process_bytes(f.read(), file_extension)
+
+
+# One OCRProcessor per pool worker process (see main.lifespan)
+_worker_processor: Optional[OCRProcessor] = None
+
+def get_worker_processor() -> OCRProcessor:
+    """Return this process's OCRProcessor, creating it on first use"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = OCRProcessor()
+    return _worker_processor
+
+def init_worker() -> None:
+    """Process pool initializer: build this worker's OCRProcessor"""
+    get_worker_processor()
+
+def process_bytes_in_worker(data: bytes, file_extension: str) -> Dict:
+    """Pool entry point: run OCR on in-memory file contents"""
+    return get_worker_processor().process_bytes(data, file_extension)
+
+def count_pdf_pages(data: bytes) -> int:
+    """Number of pages in a PDF (no rendering, no Tesseract)"""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return len(doc)
+
+def ocr_pdf_page_in_worker(data: bytes, page_number: int) -> Tuple[str, np.ndarray, int]:
+    """Pool entry point: render and OCR one PDF page"""
+    return get_worker_processor().ocr_pdf_page(data, page_number)
@@ -1,19 +1,27 @@
 import os
-import mimetypes
 from typing import Tuple
 from fastapi import UploadFile, HTTPException
 from config import settings
 
+# Characters allowed in sanitized filenames, and a table deleting the rest
+SAFE_FILENAME_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._- "
+_UNSAFE_ASCII_TABLE = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if chr(c) not in SAFE_FILENAME_CHARS
+))
+
 class FileValidator:
     """Validates uploaded files for security and compatibility"""
     
     @staticmethod
     def validate_file_size(file: UploadFile) -> None:
         """Validate file size doesn't exceed maximum"""
-        # Read file to check size
-        file.file.seek(0, 2)  # Seek to end
-        file_size = file.file.tell()
-        file.file.seek(0)  # Reset to beginning
+        # Starlette records the size while parsing the upload
+        file_size = file.size
+        if file_size is None:
+            # Fall back to measuring the spooled file
+            file.file.seek(0, 2)  # Seek to end
+            file_size = file.file.tell()
+            file.file.seek(0)  # Reset to beginning
         
         if file_size > settings.MAX_FILE_SIZE:
             raise HTTPException(
@@ -22,22 +30,24 @@ class FileValidator:
             )
     
     @staticmethod
-    def validate_file_extension(filename: str) -> None:
-        """Validate file has an allowed extension"""
+    def validate_file_extension(filename: str) -> str:
+        """Validate file has an allowed extension and return it (lowercased)"""
         _, ext = os.path.splitext(filename.lower())
         
-        if ext not in settings.allowed_extensions_list:
+        if ext not in settings.allowed_extensions_set:
             raise HTTPException(
                 status_code=400,
                 detail=f"File extension '{ext}' not allowed. Allowed extensions: {', '.join(settings.allowed_extensions_list)}"
             )
+        
+        return ext
     
     @staticmethod
     def validate_mime_type(file: UploadFile) -> None:
         """Validate file MIME type"""
         content_type = file.content_type
         
-        if content_type not in settings.allowed_mime_types_list:
+        if content_type not in settings.allowed_mime_types_set:
             raise HTTPException(
                 status_code=400,
                 detail=f"MIME type '{content_type}' not allowed. Allowed types: {', '.join(settings.allowed_mime_types_list)}"
@@ -53,8 +63,9 @@ class FileValidator:
         filename = os.path.basename(filename)
         
         # Remove any potentially dangerous characters
-        safe_chars = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._- ")
-        filename = ''.join(c for c in filename if c in safe_chars)
+        # (drop non-ASCII first so the ASCII-only table covers everything else)
+        filename = filename.encode('ascii', 'ignore').decode('ascii')
+        filename = filename.translate(_UNSAFE_ASCII_TABLE)
         
         if not filename:
             raise HTTPException(status_code=400, detail="Invalid filename")
@@ -74,7 +85,7 @@ class FileValidator:
         safe_filename = cls.validate_filename(file.filename)
         
         # Validate extension
-        cls.validate_file_extension(safe_filename)
+        ext = cls.validate_file_extension(safe_filename)
         
         # Validate MIME type
         cls.validate_mime_type(file)
@@ -82,7 +93,4 @@ class FileValidator:
         # Validate file size
         cls.validate_file_size(file)
         
-        # Get extension
-        _, ext = os.path.splitext(safe_filename.lower())
-        
         return safe_filename, ext